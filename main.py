@@ -1,10 +1,14 @@
 import psutil
+import signal
+import sys
 import threading
 import time
-import json
+import orjson
 import os
 from datetime import datetime
 import calendar
+from array import array
+from collections import namedtuple
 from flask import Flask, render_template, request, jsonify
 from flask_basicauth import BasicAuth
 
@@ -23,145 +27,437 @@ app.config['BASIC_AUTH_FORCE'] = True   # protect all routes
 
 basic_auth = BasicAuth(app)
 
+# The dashboard is rendered on every auto-refresh; resolve it once up front
+_INDEX_TEMPLATE = app.jinja_env.get_template("index.html")
+
 # ========================
 # TRAFFIC MONITOR CONFIG
 # ========================
 STATE_FILE = os.path.join(os.getenv("DATA_DIR", "/app/data"), "traffic_state.json")
 TRAFFIC_CAP_GB = int(os.getenv("TRAFFIC_CAP_GB", "500"))  # Default 500 GB
-LIMIT_BYTES = TRAFFIC_CAP_GB * 1024 * 1024 * 1024  # Convert GB to bytes
-
-state = {
-    "month": None,
-    "baseline": 0,
-    "last_bytes_sent": 0,
-    "offset_bytes": 0,
-    "daily_traffic": {},  # {"2025-09-01": bytes_used, "2025-09-02": bytes_used, ...}
-    "daily_baseline": 0,  # Daily baseline for current day
-    "current_day": None,  # Track current day
-}
-
-lock = threading.Lock()
+_GB = 1 << 30  # bytes per GB
+LIMIT_BYTES = TRAFFIC_CAP_GB * _GB  # Convert GB to bytes
+_WARN_LIMIT = LIMIT_BYTES * 0.8  # Warn at ~80% of the cap
+
+StateSnap = namedtuple(
+    "StateSnap",
+    "month baseline last_bytes_sent offset_bytes daily_traffic daily_baseline current_day",
+)
+
+
+def _empty_days():
+    """Return a zeroed daily_traffic array: one int64 per day, indexed by day - 1."""
+    return array("q", bytes(8 * 31))
+
+
+# The live state is whatever StateSnap sits in state_ref[0]. Snapshots are
+# never mutated, daily_traffic arrays included: writers build a new one with
+# _replace() (copying the array if it changes) and rebind the slot while
+# holding `lock`, so readers can take state_ref[0] without locking.
+state_ref = [StateSnap(
+    month=None,
+    baseline=0,
+    last_bytes_sent=0,
+    offset_bytes=0,
+    daily_traffic=_empty_days(),  # bytes used per day of the current month, indexed by day - 1
+    daily_baseline=0,  # Daily baseline for current day
+    current_day=None,  # Track current day
+)]
+
+lock = threading.Lock()       # serializes writers of state_ref
+save_lock = threading.Lock()  # serializes writes of STATE_FILE
+
+# monitor_traffic only persists a new counter value once it has moved this far
+SAVE_DELTA_BYTES = 1 << 20
+_last_saved_snap = None
+_last_saved_bytes = 0
+
+# Set to stop monitor_traffic; wakes it immediately instead of after a sleep
+monitor_stop = threading.Event()
+
+PROC_NET_DEV = "/proc/net/dev"
+_net_dev_fd = None
+
+# Samples taken within this many seconds of each other reuse the same value
+_COUNTER_TTL = 2.0
+# [monotonic ts, bytes_sent] of the last sample, always replaced together
+_counter_cache = [0.0, 0]
+sample_lock = threading.Lock()  # serializes reads of the counter and the cache refresh
+
+
+def _read_bytes_sent():
+    """Return total bytes sent across all interfaces.
+
+    On Linux this reads /proc/net/dev directly through a cached file
+    descriptor instead of going through psutil, which builds a per-NIC
+    result on every call. Other platforms fall back to psutil.
+
+    Caller must hold `sample_lock`.
+    """
+    global _net_dev_fd
+    if _net_dev_fd is None:
+        try:
+            _net_dev_fd = os.open(PROC_NET_DEV, os.O_RDONLY)
+        except OSError:
+            return psutil.net_io_counters(nowrap=False).bytes_sent
+
+    # The kernel keeps the read position in the shared open file, so two
+    # concurrent readers could splice halves of different snapshots;
+    # sample_lock makes this single-reader
+    chunks = []
+    offset = 0
+    while True:
+        chunk = os.pread(_net_dev_fd, 4096, offset)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+
+    total = 0
+    # Skip the two header lines; tx_bytes is the 9th field after "iface:"
+    for line in b"".join(chunks).splitlines()[2:]:
+        _, _, counters = line.partition(b":")
+        total += int(counters.split()[8])
+    return total
+
+
+def _cached_bytes_sent():
+    """Return bytes sent, re-sampling at most once every _COUNTER_TTL seconds."""
+    with sample_lock:
+        now = time.monotonic()
+        ts, bytes_sent = _counter_cache
+        if now - ts > _COUNTER_TTL:
+            bytes_sent = _read_bytes_sent()
+            _counter_cache[:] = [now, bytes_sent]
+        return bytes_sent
+
+
+_day_cache = {"unix_day": -1, "day_key": "", "month_key": ""}
+
+
+def _day_keys():
+    """Return the current UTC ("YYYY-MM", "YYYY-MM-DD") keys.
+
+    The strings are only rebuilt when the UTC day rolls over.
+    """
+    now = int(time.time())
+    unix_day = now // 86400
+    if unix_day != _day_cache["unix_day"]:
+        utc = time.gmtime(now)
+        _day_cache["month_key"] = time.strftime("%Y-%m", utc)
+        _day_cache["day_key"] = time.strftime("%Y-%m-%d", utc)
+        _day_cache["unix_day"] = unix_day
+    return _day_cache["month_key"], _day_cache["day_key"]
+
+
+def _valid_current_day(current_day, month):
+    """Return True if current_day is None or a real "YYYY-MM-DD" date inside `month`."""
+    if current_day is None:
+        return True
+    if not isinstance(current_day, str) or len(current_day) != 10 or current_day[:7] != month:
+        return False
+    try:
+        datetime.strptime(current_day, "%Y-%m-%d")
+    except ValueError:
+        return False
+    return True
+
+
+# Byte-count fields; they feed the int64 daily_traffic slots, so each must be
+# an int that fits in 64 bits
+COUNTER_FIELDS = ("baseline", "last_bytes_sent", "offset_bytes", "daily_baseline")
+
+
+def _is_int64(value):
+    """Return True if value is an int (not a bool) that fits a signed 64-bit slot."""
+    return type(value) is int and -(1 << 63) <= value < (1 << 63)
+
+
+def _daily_traffic_error(daily_traffic):
+    """Return why daily_traffic can't be stored, or None if it is valid.
+
+    Accepts a list of up to 31 byte counts or a {"YYYY-MM-DD": bytes}
+    mapping; counts must be ints that fit the int64 array slots.
+    """
+    if isinstance(daily_traffic, dict):
+        for day_key in daily_traffic:
+            try:
+                datetime.strptime(day_key, "%Y-%m-%d")
+            except ValueError:
+                return f"invalid day key {day_key!r}, expected YYYY-MM-DD"
+        values = daily_traffic.values()
+    elif isinstance(daily_traffic, list):
+        if len(daily_traffic) > 31:
+            return "expected at most 31 daily values"
+        values = daily_traffic
+    else:
+        return "expected a list or a {\"YYYY-MM-DD\": bytes} object"
+    for used in values:
+        if not _is_int64(used):
+            return f"invalid byte count {used!r}, expected a 64-bit integer"
+    return None
+
+
+def _as_daily_traffic(daily_traffic, month, base=None):
+    """Normalize daily_traffic to a new 31-slot int64 array indexed by day - 1.
+
+    A {"YYYY-MM-DD": bytes} mapping (the layout older state files used) is
+    laid over a copy of `base`, or over zeros if not given; entries outside
+    `month` are dropped. A list fills the days in order.
+    """
+    days = array("q", base) if base is not None else _empty_days()
+    if isinstance(daily_traffic, dict):
+        for day_key, used in daily_traffic.items():
+            if day_key[:7] == month:
+                days[int(day_key[8:10]) - 1] = used
+    else:
+        daily_traffic = list(daily_traffic)[:31]
+        days[:len(daily_traffic)] = array("q", daily_traffic)
+    return days
+
+
+def _json_default(obj):
+    """orjson fallback: write daily_traffic arrays as plain JSON lists."""
+    if isinstance(obj, array):
+        return obj.tolist()
+    raise TypeError
+
+
+_last_update_cache = [0, ""]
+
+
+def _now_str():
+    """Return local time as "YYYY-MM-DD HH:MM:SS", formatted once per second."""
+    t = int(time.time())
+    if t != _last_update_cache[0]:
+        _last_update_cache[:] = [t, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t))]
+    return _last_update_cache[1]
 
 
 def load_state():
-    global state
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            state.update(json.load(f))
+    if not os.path.exists(STATE_FILE):
+        return
+    with open(STATE_FILE, "rb", buffering=65536) as f:
+        saved = orjson.loads(f.read())
+    fields = {k: saved[k] for k in StateSnap._fields if k in saved}
+    if not _valid_current_day(fields.get("current_day"), fields.get("month")):
+        # Let init_baseline start a fresh day instead of tripping over it
+        fields["current_day"] = None
+    for key in COUNTER_FIELDS:
+        if key in fields and not _is_int64(fields[key]):
+            fields[key] = 0
+    if "daily_traffic" in fields:
+        if _daily_traffic_error(fields["daily_traffic"]):
+            fields["daily_traffic"] = []
+        fields["daily_traffic"] = _as_daily_traffic(fields["daily_traffic"], fields.get("month"))
+    with lock:
+        state_ref[0] = state_ref[0]._replace(**fields)
 
 
 def save_state():
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(state, f)
+    """Persist the current state snapshot.
+
+    Skips the write if nothing changed since the last save.
+    """
+    global _last_saved_snap, _last_saved_bytes
+    with save_lock:
+        snap = state_ref[0]
+        if snap == _last_saved_snap:
+            return
+        # Write to a temp file and rename so a crash mid-write can't leave a
+        # truncated state file behind
+        tmp = STATE_FILE + ".tmp"
+        with open(tmp, "wb", buffering=65536) as f:
+            f.write(orjson.dumps(snap._asdict(), default=_json_default))
+        os.replace(tmp, STATE_FILE)
+        _last_saved_snap = snap
+        _last_saved_bytes = snap.last_bytes_sent
 
 
 def init_baseline():
-    global state
-    now = datetime.utcnow()
-    month_key = now.strftime("%Y-%m")
-    day_key = now.strftime("%Y-%m-%d")
-    current_sent = psutil.net_io_counters().bytes_sent
-
-    # Handle monthly reset
-    if state["month"] != month_key:
-        state["month"] = month_key
-        state["baseline"] = current_sent
-        state["last_bytes_sent"] = current_sent
-        state["daily_traffic"] = {}  # Reset daily tracking for new month
-        state["daily_baseline"] = current_sent
-        state["current_day"] = day_key
-        save_state()
-    
-    # Handle daily reset
-    elif state["current_day"] != day_key:
-        # Save yesterday's traffic
-        if state["current_day"]:
-            yesterday_traffic = current_sent - state["daily_baseline"]
-            state["daily_traffic"][state["current_day"]] = yesterday_traffic
+    """Roll the monthly/daily baselines over if needed.
+
+    Returns True if the state changed and should be saved. The common
+    no-rollover case only reads the current snapshot and takes no lock.
+    """
+    month_key, day_key = _day_keys()
+    snap = state_ref[0]
+    if snap.month == month_key and snap.current_day == day_key:
+        return False
+
+    with lock:
+        # Re-check: another writer may have rolled over in the meantime
+        snap = state_ref[0]
+        current_sent = _cached_bytes_sent()
+
+        # Handle monthly reset
+        if snap.month != month_key:
+            state_ref[0] = snap._replace(
+                month=month_key,
+                baseline=current_sent,
+                last_bytes_sent=current_sent,
+                daily_traffic=_empty_days(),  # Reset daily tracking for new month
+                daily_baseline=current_sent,
+                current_day=day_key,
+            )
+            return True
         
-        # Start new day
-        state["daily_baseline"] = current_sent
-        state["current_day"] = day_key
-        save_state()
+        # Handle daily reset
+        elif snap.current_day != day_key:
+            daily_traffic = snap.daily_traffic
+            # Save yesterday's traffic
+            if snap.current_day and snap.current_day[:7] == snap.month:
+                yesterday_traffic = current_sent - snap.daily_baseline
+                yesterday = int(snap.current_day[8:10])
+                daily_traffic = array("q", daily_traffic)
+                daily_traffic[yesterday - 1] = yesterday_traffic
+            
+            # Start new day
+            state_ref[0] = snap._replace(
+                daily_traffic=daily_traffic,
+                daily_baseline=current_sent,
+                current_day=day_key,
+            )
+            return True
 
+    return False
 
-def monitor_traffic(interval=10):
-    global state
-    while True:
-        time.sleep(interval)
-        with lock:
-            init_baseline()
-            state["last_bytes_sent"] = psutil.net_io_counters().bytes_sent
-            save_state()
 
+# time.monotonic_ns() of the last request handler that refreshed the state
+_last_handler_ts = [0]
 
-@app.route("/")
-@basic_auth.required
-def index():
+
+def _refresh_last_bytes_sent():
+    """Fold the latest counter sample into the state and return the sample.
+
+    Only takes the writer lock when the cached sample has expired or differs
+    from the state. The sample is then taken under `lock`, so samples are
+    published in the order they were taken; the counter may go down (host
+    reboot, interface removed) and is published as-is.
+    """
+    ts, current_sent = _counter_cache
+    if time.monotonic() - ts <= _COUNTER_TTL and current_sent == state_ref[0].last_bytes_sent:
+        return current_sent
     with lock:
-        init_baseline()
-        raw_used_bytes = state["last_bytes_sent"] - state["baseline"]
-        used_bytes = raw_used_bytes + state["offset_bytes"]  # Add manual offset
-        used_gb = round(used_bytes / (1024 ** 3), 2)
-        offset_gb = round(state["offset_bytes"] / (1024 ** 3), 2)
-        month = state["month"]
-
-        if used_bytes > LIMIT_BYTES:
-            status_class = "over"
-            status_msg = "⚠️ Over limit! Extra charges apply."
-        elif used_bytes > LIMIT_BYTES * 0.8:
-            status_class = "warn"
-            status_msg = f"Warning: {used_gb} GB used (~80% of limit)."
-        else:
-            status_class = ""
-            status_msg = "Within safe limit."
-
-        last_update = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        current_sent = _cached_bytes_sent()
+        if current_sent != state_ref[0].last_bytes_sent:
+            state_ref[0] = state_ref[0]._replace(last_bytes_sent=current_sent)
+    return current_sent
 
-    return render_template(
-        'index.html',
+
+def monitor_traffic(interval=10):
+    # Ticks are scheduled against fixed deadlines, so time spent sampling and
+    # saving doesn't push every later tick back
+    interval_ns = int(interval * 1_000_000_000)
+    next_tick = time.monotonic_ns() + interval_ns
+    while not monitor_stop.wait(max(0, next_tick - time.monotonic_ns()) / 1_000_000_000):
+        next_tick += interval_ns
+        now_ns = time.monotonic_ns()
+        if next_tick <= now_ns:
+            # Fell a whole interval behind (e.g. host suspended); skip the
+            # missed ticks rather than firing them back to back
+            next_tick = now_ns + interval_ns
+
+        try:
+            if now_ns - _last_handler_ts[0] < interval_ns:
+                # A handler already rolled the baselines over and refreshed the
+                # counter within this interval; only the save check is left
+                changed = False
+                current_sent = state_ref[0].last_bytes_sent
+            else:
+                changed = init_baseline()
+                current_sent = _refresh_last_bytes_sent()
+            if changed or abs(current_sent - _last_saved_bytes) > SAVE_DELTA_BYTES:
+                save_state()
+        except Exception:
+            # Keep monitoring; one bad tick must not stop the thread for good
+            app.logger.exception("Traffic monitor tick failed")
+
+
+TrafficStatus = namedtuple(
+    "TrafficStatus",
+    "month used_gb offset_gb status_class status_msg raw_bytes_sent",
+)
+
+# [inputs, TrafficStatus] of the last _compute_status() call
+_derived_cache = [None, None]
+
+
+def _compute_status():
+    """Return the dashboard figures shared by index and data.
+
+    The result only depends on a few state fields, so it is reused until
+    one of them changes; the page load and its /data polls then share a
+    single computation.
+    """
+    if init_baseline():
+        save_state()
+    _refresh_last_bytes_sent()
+    _last_handler_ts[0] = time.monotonic_ns()
+    snap = state_ref[0]
+    key = (snap.last_bytes_sent, snap.baseline, snap.offset_bytes, snap.month)
+
+    cached_key, cached = _derived_cache
+    if cached_key == key:
+        return cached
+
+    last_bytes_sent, baseline, offset_bytes, month = key
+    raw_used_bytes = last_bytes_sent - baseline
+    used_bytes = raw_used_bytes + offset_bytes  # Add manual offset
+    used_gb = round(used_bytes / _GB, 2)
+    offset_gb = round(offset_bytes / _GB, 2)
+
+    if used_bytes > LIMIT_BYTES:
+        status_class = "over"
+        status_msg = "⚠️ Over limit! Extra charges apply."
+    elif used_bytes > _WARN_LIMIT:
+        status_class = "warn"
+        status_msg = f"Warning: {used_gb} GB used (~80% of limit)."
+    else:
+        status_class = ""
+        status_msg = "Within safe limit."
+
+    status = TrafficStatus(
+        month=month,
         used_gb=used_gb,
         offset_gb=f"{offset_gb:.2f}",
-        cap_gb=TRAFFIC_CAP_GB,
-        month=month,
         status_class=status_class,
         status_msg=status_msg,
-        last_update=last_update,
+        raw_bytes_sent=last_bytes_sent,
+    )
+    _derived_cache[:] = [key, status]
+    return status
+
+
+@app.route("/")
+@basic_auth.required
+def index():
+    status = _compute_status()
+    return render_template(
+        _INDEX_TEMPLATE,
+        used_gb=status.used_gb,
+        offset_gb=status.offset_gb,
+        cap_gb=TRAFFIC_CAP_GB,
+        month=status.month,
+        status_class=status.status_class,
+        status_msg=status.status_msg,
+        last_update=_now_str(),
     )
 
 
 @app.route("/data")
 @basic_auth.required
 def data():
-    with lock:
-        init_baseline()
-        raw_used_bytes = state["last_bytes_sent"] - state["baseline"]
-        used_bytes = raw_used_bytes + state["offset_bytes"]  # Add manual offset
-        used_gb = round(used_bytes / (1024 ** 3), 2)
-        offset_gb = round(state["offset_bytes"] / (1024 ** 3), 2)
-        month = state["month"]
-
-        if used_bytes > LIMIT_BYTES:
-            status_class = "over"
-            status_msg = "⚠️ Over limit! Extra charges apply."
-        elif used_bytes > LIMIT_BYTES * 0.8:
-            status_class = "warn"
-            status_msg = f"Warning: {used_gb} GB used (~80% of limit)."
-        else:
-            status_class = ""
-            status_msg = "Within safe limit."
-
-        last_update = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-
+    status = _compute_status()
     return jsonify({
-        "used_gb": used_gb,
-        "offset_gb": f"{offset_gb:.2f}",
+        "used_gb": status.used_gb,
+        "offset_gb": status.offset_gb,
         "cap_gb": TRAFFIC_CAP_GB,
-        "month": month,
-        "status_class": status_class,
-        "status_msg": status_msg,
-        "last_update": last_update,
-        "raw_bytes_sent": state["last_bytes_sent"],  # Add raw bytes data
+        "month": status.month,
+        "status_class": status.status_class,
+        "status_msg": status.status_msg,
+        "last_update": _now_str(),
+        "raw_bytes_sent": status.raw_bytes_sent,  # Add raw bytes data
         "timestamp": int(time.time())  # Add timestamp for pulse calculation
     })
 
@@ -172,49 +468,39 @@ def daily():
     return render_template('daily.html')
 
 
+# Chart x-axis labels "1".."31"; a month just takes the first days_in_month
+_DAY_LABELS = [str(d) for d in range(1, 32)]
+
+
 @app.route("/daily-chart")
 @basic_auth.required
 def daily_chart():
-    with lock:
-        init_baseline()
-        now = datetime.utcnow()
-        year = now.year
-        month = now.month
-        
-        # Get number of days in current month
-        days_in_month = calendar.monthrange(year, month)[1]
-        
-        # Calculate today's traffic
-        current_sent = psutil.net_io_counters().bytes_sent
-        today_traffic = current_sent - state["daily_baseline"]
-        today_key = now.strftime("%Y-%m-%d")
-        
-        # Build chart data for the entire month
-        chart_data = []
-        labels = []
-        
-        for day in range(1, days_in_month + 1):
-            day_key = f"{year:04d}-{month:02d}-{day:02d}"
-            labels.append(f"{day}")
-            
-            if day_key == today_key:
-                # Today's traffic (current)
-                traffic_gb = round(today_traffic / (1024 ** 3), 3)
-            elif day_key in state["daily_traffic"]:
-                # Past days with recorded traffic
-                traffic_gb = round(state["daily_traffic"][day_key] / (1024 ** 3), 3)
-            else:
-                # Future days or days without data
-                traffic_gb = 0
-            
-            chart_data.append(traffic_gb)
-        
-        return jsonify({
-            "labels": labels,
-            "data": chart_data,
-            "month": now.strftime("%B %Y"),
-            "today": now.day
-        })
+    if init_baseline():
+        save_state()
+    current_sent = _refresh_last_bytes_sent()
+    _last_handler_ts[0] = time.monotonic_ns()
+    snap = state_ref[0]
+
+    now = datetime.utcnow()
+    
+    # Get number of days in current month
+    days_in_month = calendar.monthrange(now.year, now.month)[1]
+    
+    # Slicing copies the array; today's slot holds the live value and
+    # future days are still 0
+    daily_traffic = snap.daily_traffic[:days_in_month]
+    daily_traffic[now.day - 1] = current_sent - snap.daily_baseline
+    
+    # Build chart data for the entire month
+    chart_data = [round(used / _GB, 3) for used in daily_traffic]
+    labels = _DAY_LABELS[:days_in_month]
+    
+    return jsonify({
+        "labels": labels,
+        "data": chart_data,
+        "month": now.strftime("%B %Y"),
+        "today": now.day
+    })
 
 
 @app.route("/adjust", methods=['POST'])
@@ -226,11 +512,11 @@ def adjust():
             return jsonify({"success": False, "error": "Missing 'offset' in JSON body"}), 400
         
         new_offset_gb = float(data['offset'])
-        new_offset_bytes = int(new_offset_gb * 1024 * 1024 * 1024)  # Convert GB to bytes
+        new_offset_bytes = int(new_offset_gb * _GB)  # Convert GB to bytes
         
         with lock:
-            state["offset_bytes"] = new_offset_bytes  # Rewrite, don't add
-            save_state()
+            state_ref[0] = state_ref[0]._replace(offset_bytes=new_offset_bytes)  # Rewrite, don't add
+        save_state()
         
         return jsonify({
             "success": True, 
@@ -252,8 +538,8 @@ def config():
 @app.route("/api/traffic-state", methods=['GET'])
 @basic_auth.required
 def get_traffic_state():
-    with lock:
-        return jsonify(state)
+    snap = state_ref[0]
+    return jsonify(snap._replace(daily_traffic=snap.daily_traffic.tolist())._asdict())
 
 
 @app.route("/api/traffic-state", methods=['POST'])
@@ -264,15 +550,36 @@ def update_traffic_state():
         if not data:
             return jsonify({"success": False, "error": "No JSON data provided"}), 400
         
+        # Validate the structure (basic check)
+        required_keys = ["month", "baseline", "last_bytes_sent", "offset_bytes", "daily_traffic", "daily_baseline", "current_day"]
+        for key in required_keys:
+            if key not in data:
+                return jsonify({"success": False, "error": f"Missing required key: {key}"}), 400
+        
+        if not _valid_current_day(data["current_day"], data["month"]):
+            return jsonify({"success": False, "error": "current_day must be null or a YYYY-MM-DD date within month"}), 400
+        
+        for key in COUNTER_FIELDS:
+            if not _is_int64(data[key]):
+                return jsonify({"success": False, "error": f"Invalid {key}: expected a 64-bit integer"}), 400
+        
+        daily_error = _daily_traffic_error(data["daily_traffic"])
+        if daily_error:
+            return jsonify({"success": False, "error": f"Invalid daily_traffic: {daily_error}"}), 400
+        
+        fields = {key: data[key] for key in StateSnap._fields}
+        
+        # Update state, replacing only the fields that actually differ
         with lock:
-            # Validate the structure (basic check)
-            required_keys = ["month", "baseline", "last_bytes_sent", "offset_bytes", "daily_traffic", "daily_baseline", "current_day"]
-            for key in required_keys:
-                if key not in data:
-                    return jsonify({"success": False, "error": f"Missing required key: {key}"}), 400
-            
-            # Update state
-            state.update(data)
+            snap = state_ref[0]
+            # A day -> bytes mapping for the current month only patches the
+            # listed days; a list replaces the whole month
+            base = snap.daily_traffic if fields["month"] == snap.month else None
+            fields["daily_traffic"] = _as_daily_traffic(fields["daily_traffic"], fields["month"], base)
+            changed = {key: value for key, value in fields.items() if getattr(snap, key) != value}
+            if changed:
+                state_ref[0] = snap._replace(**changed)
+        if changed:
             save_state()
         
         return jsonify({"success": True, "message": "Traffic state updated successfully"})
@@ -283,7 +590,17 @@ def update_traffic_state():
 
 if __name__ == "__main__":
     load_state()
-    init_baseline()
+    if init_baseline():
+        save_state()
     thread = threading.Thread(target=monitor_traffic, daemon=True)
     thread.start()
-    app.run(host="0.0.0.0", port=8080)
+    # As PID 1 in the container, SIGTERM from `docker stop` is otherwise
+    # ignored until the SIGKILL; raise SystemExit so the flush below runs
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        app.run(host="0.0.0.0", port=8080)
+    finally:
+        # Stop sampling and flush whatever the save threshold held back
+        monitor_stop.set()
+        thread.join()
+        save_state()